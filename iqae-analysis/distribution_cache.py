@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from discretization import DiscreteDistribution, discretize, tail_adaptive_grid
+
+# Bump when the stored arrays or the discretization itself change, so stale
+# on-disk entries are never read back
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "IQAE_DISCRETIZATION_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "iqae-var"))
+
+
+def cache_key(family, params, low, high, num_qubits, grid="uniform", grid_options=None,
+              include_tails=False):
+    """
+    Content address of a discretized distribution: SHA-256 of the canonical
+    JSON of everything that determines its arrays. Floats go through repr, so
+    equal parameters always hash equally and nearby ones never collide.
+    """
+    spec = {
+        "version": CACHE_VERSION,
+        "family": family,
+        "params": {name: repr(float(value)) for name, value in sorted(params.items())},
+        "low": repr(float(low)),
+        "high": repr(float(high)),
+        "num_qubits": int(num_qubits),
+        "grid": grid,
+        "grid_options": {name: repr(float(value))
+                         for name, value in sorted((grid_options or {}).items())},
+        "include_tails": bool(include_tails),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def build_grid(low, high, num_qubits, grid="uniform", grid_options=None):
+    """Grid points for a named grid kind ("uniform" or "tail_adaptive")."""
+    if grid == "uniform":
+        return np.linspace(low, high, 2**num_qubits)
+    if grid == "tail_adaptive":
+        return tail_adaptive_grid(low, high, num_qubits, **(grid_options or {}))
+    raise ValueError(f"unknown grid kind {grid!r}")
+
+
+class DistributionCache:
+    """
+    Discretized distributions keyed by (scipy.stats family, params, truncation
+    [low, high], num_qubits, grid), so sweeps over qubit counts, confidence
+    levels or regimes evaluate scipy's cdf/logcdf on each grid only once.
+
+    Two levels: an in-memory LRU holding at most `max_bytes` of arrays, and
+    (when cache_dir is set) one content-addressed .npz per entry on disk with
+    its grid, probs, CDF and Grover-Rudolph angles, least recently used files
+    removed once they total more than `max_disk_bytes`. Both budgets are in
+    bytes, not entries, since one 2^20-point grid outweighs thousands of small
+    ones; the most recent entry is always kept, even when it alone is over.
+    Returned DiscreteDistributions share their arrays with the cache, so
+    treat them as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, cache_dir=None, max_disk_bytes=2 * 2**30):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, family, params, low, high, num_qubits, grid="uniform", grid_options=None,
+            include_tails=False):
+        """DiscreteDistribution of scipy.stats.<family>(**params) on the requested grid."""
+        key = cache_key(family, params, low, high, num_qubits, grid, grid_options, include_tails)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        dist = self._load(key)
+        if dist is not None:
+            self.disk_hits += 1
+        else:
+            import scipy.stats as stats
+
+            self.misses += 1
+            grid_points = build_grid(low, high, num_qubits, grid, grid_options)
+            dist = discretize(getattr(stats, family)(**params), grid_points,
+                              include_tails=include_tails)
+            self._store(key, dist)
+
+        self._memory[key] = dist
+        self._evict_memory()
+        return dist
+
+    @property
+    def nbytes(self):
+        """Bytes held by the in-memory entries' arrays."""
+        return sum(_nbytes(dist) for dist in self._memory.values())
+
+    def clear(self, disk=False):
+        """Empties the in-memory LRU (and the on-disk entries when disk=True)."""
+        self._memory.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                dist = DiscreteDistribution(data["grid_points"], data["probs"], cdf=data["cdf"],
+                                            angles=data["angles"])
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used for disk eviction
+        return dist
+
+    def _store(self, key, dist):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write-then-rename, so concurrent readers never see a partial file
+        tmp = self._path(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, grid_points=dist.grid_points, probs=dist.probs, cdf=dist.cdf,
+                     angles=dist.angles)
+        os.replace(tmp, self._path(key))
+        self._evict_disk()
+
+    def _evict_memory(self):
+        # Re-summed on every insert: angles are filled in lazily, so an entry
+        # can grow after it was cached
+        total = self.nbytes
+        while total > self.max_bytes and len(self._memory) > 1:
+            _, dist = self._memory.popitem(last=False)
+            total -= _nbytes(dist)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _nbytes(dist):
+    arrays = (dist.grid_points, dist.probs, dist.cdf, dist._partial_mean, dist._angles)
+    return sum(array.nbytes for array in arrays if array is not None)
+
+
+default_cache = DistributionCache(cache_dir=DEFAULT_CACHE_DIR)
+
+
+def cached_discretize(family, params, low, high, num_qubits, grid="uniform", grid_options=None,
+                      include_tails=False):
+    """default_cache.get(...): shared in-memory + on-disk cache across notebooks."""
+    return default_cache.get(family, params, low, high, num_qubits, grid, grid_options,
+                             include_tails)
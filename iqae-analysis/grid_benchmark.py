@@ -0,0 +1,92 @@
+import argparse
+
+import numpy as np
+import scipy.stats as stats
+
+from discretization import cell_edges, discretize, tail_adaptive_grid
+
+
+def truncated_ppf(dist, alpha, low, high):
+    """alpha-quantile of `dist` truncated to [low, high] (what a grid on it represents)."""
+    f_low, f_high = dist.cdf(low), dist.cdf(high)
+    return float(dist.ppf(f_low + alpha * (f_high - f_low)))
+
+
+def var_error(dist, alpha, grid_points):
+    """
+    |discrete VaR - VaR| for an exact-mass grid, with VaR the alpha-quantile of
+    `dist` truncated to the grid's outer cell edges (the distribution the
+    grid actually represents, see discretize).
+    """
+    edges = cell_edges(grid_points)
+    target = truncated_ppf(dist, alpha, edges[0], edges[-1])
+    return abs(float(discretize(dist, grid_points).var_return(alpha)) - target)
+
+
+def grid_error_benchmark(dist, alpha, low, high, qubits, tail_weight=0.75, width=None):
+    """
+    Discrete-VaR error (see var_error) of the uniform grid vs the
+    tail-adaptive grid centred on the VaR, for each qubit count.
+
+    Returns one dict per qubit count.
+    """
+    center = truncated_ppf(dist, alpha, low, high)
+    rows = []
+    for num_qubits in qubits:
+        uniform = np.linspace(low, high, 2**num_qubits)
+        adaptive = tail_adaptive_grid(low, high, num_qubits, center, width=width,
+                                      tail_weight=tail_weight)
+        rows.append({
+            "num_qubits": num_qubits,
+            "uniform_error": var_error(dist, alpha, uniform),
+            "adaptive_error": var_error(dist, alpha, adaptive),
+        })
+    return rows
+
+
+def qubits_needed(rows, key, target_error):
+    """Smallest qubit count from which `key` error stays <= target_error (None if never)."""
+    needed = None
+    for row in reversed(rows):
+        if row[key] > target_error:
+            break
+        needed = row["num_qubits"]
+    return needed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VaR discretization error: uniform vs tail-adaptive grid")
+    parser.add_argument("--family", choices=["norm", "t"], default="norm")
+    parser.add_argument("--mu", type=float, default=0.15)
+    parser.add_argument("--sigma", type=float, default=0.20)
+    parser.add_argument("--df", type=float, default=3.0, help="Student-t degrees of freedom")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--L", type=float, default=4.0, help="grid spans mu +/- L * sigma")
+    parser.add_argument("--min-qubits", type=int, default=3)
+    parser.add_argument("--max-qubits", type=int, default=14)
+    parser.add_argument("--tail-weight", type=float, default=0.75)
+    parser.add_argument("--target-error", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    if args.family == "norm":
+        dist = stats.norm(loc=args.mu, scale=args.sigma)
+    else:
+        dist = stats.t(args.df, loc=args.mu, scale=args.sigma)
+    low, high = args.mu - args.L * args.sigma, args.mu + args.L * args.sigma
+    alpha = 1 - args.confidence
+
+    rows = grid_error_benchmark(dist, alpha, low, high,
+                                range(args.min_qubits, args.max_qubits + 1),
+                                tail_weight=args.tail_weight)
+    print("num_qubits,uniform_error,adaptive_error")
+    for row in rows:
+        print(f"{row['num_qubits']},{row['uniform_error']:.3e},{row['adaptive_error']:.3e}")
+
+    for key in ("uniform_error", "adaptive_error"):
+        needed = qubits_needed(rows, key, args.target_error)
+        print(f"{key.split('_')[0]:>8} grid: error <= {args.target_error:g} from "
+              f"{needed if needed is not None else '>' + str(args.max_qubits)} qubits")
+
+
+if __name__ == "__main__":
+    main()
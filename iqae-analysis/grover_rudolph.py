@@ -0,0 +1,95 @@
+import numpy as np
+
+# Grover-Rudolph state preparation of |psi> = sum_i sqrt(probs[i]) |i>.
+#
+# Qubit k (k = 0 is the most significant index bit) gets an Ry(theta) rotation
+# controlled on the k bits above it. The angle for prefix j is set by the
+# conditional probability of the next bit being 1:
+#     cos(theta / 2) = sqrt(P(left half of node j)  / P(node j))
+#     sin(theta / 2) = sqrt(P(right half of node j) / P(node j))
+# Angles are stored flat in heap order: level k occupies [2^k - 1, 2^(k+1) - 1),
+# N - 1 angles in total for N = 2^n points.
+
+
+def level_masses(probs):
+    """
+    Mass of every node of the binary tree over the index bits, root first:
+    level k is a length-2^k array. Each level is one reshape-and-sum of the
+    level below, so the whole tree costs O(N).
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    n = probs.size.bit_length() - 1
+    if probs.ndim != 1 or probs.size != 2**n:
+        raise ValueError("probs must be a 1-D array of length 2^n")
+    if np.any(probs < 0):
+        raise ValueError("probs must be non-negative")
+    levels = [probs / probs.sum()]
+    for _ in range(n):
+        # Strided pair sum: same as reshape(-1, 2).sum(axis=1), without the
+        # slow length-2 reduction loop
+        levels.append(levels[-1][0::2] + levels[-1][1::2])
+    return levels[::-1]
+
+
+def grover_rudolph_angles(probs):
+    """
+    Flat heap-ordered Ry angles (length N - 1) preparing sqrt(probs).
+
+    theta = 2 * arctan2(sqrt(right), sqrt(left)) is exact for nodes of any size
+    and gives 0 for empty nodes, so zero-probability regions need no special
+    case. Each level is a handful of whole-array ops (log2 N levels in all).
+    """
+    levels = level_masses(probs)
+    angles = np.empty(levels[-1].size - 1)
+    for k, children in enumerate(levels[1:]):
+        root = np.sqrt(children)
+        np.arctan2(root[1::2], root[0::2], out=angles[2**k - 1:2**(k + 1) - 1])
+    angles *= 2
+    return angles
+
+
+def angles_by_level(angles):
+    """Splits flat heap-ordered angles into per-level arrays (level k has 2^k angles)."""
+    angles = np.asarray(angles)
+    n = (angles.size + 1).bit_length() - 1
+    return [angles[2**k - 1:2**(k + 1) - 1] for k in range(n)]
+
+
+def amplitudes_from_angles(angles):
+    """
+    State amplitudes produced by the rotation tree (all real and non-negative),
+    rebuilt level by level: each amplitude splits into (a cos(theta/2), a sin(theta/2)).
+    """
+    amplitudes = np.ones(1)
+    for level in angles_by_level(angles):
+        half = 0.5 * level
+        amplitudes = np.stack((amplitudes * np.cos(half), amplitudes * np.sin(half)), axis=1).ravel()
+    return amplitudes
+
+
+def max_amplitude_error(angles, probs):
+    """max_i |amplitude_i - sqrt(probs[i] / sum(probs))|: cross-check against the loaded state."""
+    probs = np.asarray(probs, dtype=np.float64)
+    return float(np.max(np.abs(amplitudes_from_angles(angles) - np.sqrt(probs / probs.sum()))))
+
+
+def rotation_counts(angles, atol=0.0):
+    """
+    Per-level number of rotations with |theta| > atol, i.e. the multi-controlled
+    Ry gates a circuit actually needs once trivial rotations are dropped.
+    """
+    return [int(np.count_nonzero(np.abs(level) > atol)) for level in angles_by_level(angles)]
+
+
+def save_angles(path, angles, probs=None):
+    """Writes angles (and optionally the probs they came from) to an .npz file."""
+    arrays = {"angles": np.asarray(angles, dtype=np.float64)}
+    if probs is not None:
+        arrays["probs"] = np.asarray(probs, dtype=np.float64)
+    np.savez(path, **arrays)
+
+
+def load_angles(path):
+    """Angles written by save_angles."""
+    with np.load(path) as data:
+        return data["angles"]
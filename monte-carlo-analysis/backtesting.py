@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.special import xlogy
+from scipy.stats import chi2
+
+# Series are laid out like historical_var: time on axis 0, portfolios on axis 1.
+# A 1-D series is treated as a single portfolio.
+
+
+@dataclass
+class BacktestResult:
+    # One entry per portfolio
+    num_observations: int
+    num_exceptions: np.ndarray
+    exception_rate: np.ndarray
+    lr_pof: np.ndarray
+    p_pof: np.ndarray
+    lr_ind: np.ndarray
+    p_ind: np.ndarray
+    lr_cc: np.ndarray
+    p_cc: np.ndarray
+
+
+def _as_columns(x):
+    x = np.asarray(x)
+    return x.reshape(x.shape[0], -1)
+
+
+def var_exceptions(var_forecasts, realized):
+    """
+    Exception indicators: realized return below the VaR return threshold (the
+    convention of calculate_analytical_var, i.e. VaR is a negative return).
+    Accepts (T,) or (T, portfolios); a 1-D forecast is broadcast across portfolios.
+    """
+    realized = _as_columns(realized)
+    var_forecasts = np.asarray(var_forecasts)
+    if var_forecasts.ndim == 1:
+        var_forecasts = var_forecasts[:, None]
+    return realized < var_forecasts
+
+
+def _bernoulli_loglik(successes, trials, p):
+    # log(p^x (1 - p)^(n - x)) with 0 * log(0) = 0 at the boundaries
+    return xlogy(successes, p) + xlogy(trials - successes, 1 - p)
+
+
+def kupiec_pof(exceptions, confidence_level):
+    """Kupiec proportion-of-failures LR statistic and chi2(1) p-value, per column."""
+    exceptions = _as_columns(exceptions)
+    T = exceptions.shape[0]
+    x = exceptions.sum(axis=0)
+    p = 1 - confidence_level
+    lr = -2 * (_bernoulli_loglik(x, T, p) - _bernoulli_loglik(x, T, x / T))
+    lr = np.maximum(lr, 0.0)
+    return lr, chi2.sf(lr, df=1)
+
+
+def christoffersen_independence(exceptions):
+    """
+    Christoffersen independence LR statistic and chi2(1) p-value, per column,
+    from the first-order Markov transition counts of the exception series.
+    """
+    exceptions = _as_columns(exceptions).astype(bool)
+    prev, curr = exceptions[:-1], exceptions[1:]
+    n01 = np.sum(~prev & curr, axis=0)
+    n00 = np.sum(~prev & ~curr, axis=0)
+    n11 = np.sum(prev & curr, axis=0)
+    n10 = np.sum(prev & ~curr, axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pi01 = np.where(n00 + n01 > 0, n01 / (n00 + n01), 0.0)
+        pi11 = np.where(n10 + n11 > 0, n11 / (n10 + n11), 0.0)
+        pi = (n01 + n11) / (n00 + n01 + n10 + n11)
+
+    loglik_null = _bernoulli_loglik(n01 + n11, n00 + n01 + n10 + n11, pi)
+    loglik_alt = _bernoulli_loglik(n01, n00 + n01, pi01) + _bernoulli_loglik(n11, n10 + n11, pi11)
+    lr = np.maximum(-2 * (loglik_null - loglik_alt), 0.0)
+    return lr, chi2.sf(lr, df=1)
+
+
+def backtest_var(var_forecasts, realized, confidence_level):
+    """
+    Full VaR backtest of one or many portfolios in one vectorized call:
+    Kupiec POF (unconditional coverage), Christoffersen independence and their
+    sum, the conditional-coverage statistic (chi2 with 2 dof).
+
+    `var_forecasts` can come from any estimator in this repo (MC, analytic,
+    discretized grid or IQAE-simulated); `realized` is the P&L / return series.
+    """
+    exceptions = var_exceptions(var_forecasts, realized)
+    T = exceptions.shape[0]
+    lr_pof, p_pof = kupiec_pof(exceptions, confidence_level)
+    lr_ind, p_ind = christoffersen_independence(exceptions)
+    lr_cc = lr_pof + lr_ind
+    num_exceptions = exceptions.sum(axis=0)
+    return BacktestResult(
+        num_observations=T,
+        num_exceptions=num_exceptions,
+        exception_rate=num_exceptions / T,
+        lr_pof=lr_pof,
+        p_pof=p_pof,
+        lr_ind=lr_ind,
+        p_ind=p_ind,
+        lr_cc=lr_cc,
+        p_cc=chi2.sf(lr_cc, df=2),
+    )
@@ -0,0 +1,67 @@
+import numpy as np
+
+from quantiles import partition_percentile
+
+
+def _resampled_quantiles(samples, percentile, num_resamples, size, rng, max_block_size):
+    """
+    VaR quantile of `num_resamples` with-replacement resamples of `size` points
+    each. Index blocks (B_chunk, size) are drawn in one rng.integers call,
+    gathered into a fresh array and reduced with one in-place partition along
+    axis 1. No Python loop over resamples.
+    """
+    n = samples.size
+    index_dtype = np.int32 if n < 2**31 else np.int64
+    estimates = np.empty(num_resamples)
+    per_block = max(1, min(num_resamples, max_block_size // size))
+    for start in range(0, num_resamples, per_block):
+        stop = min(start + per_block, num_resamples)
+        idx = rng.integers(0, n, size=(stop - start, size), dtype=index_dtype)
+        estimates[start:stop] = partition_percentile(samples[idx], percentile, axis=1,
+                                                     overwrite_input=True)
+    return estimates
+
+
+def bootstrap_var_ci(samples, confidence_level, num_resamples=1000, ci_level=0.95,
+                     rng=None, max_block_size=2**22):
+    """
+    Percentile-bootstrap confidence interval for the VaR estimate of ONE sample
+    set (e.g. one production MC run).
+
+    Returns (estimate, (ci_low, ci_high), bootstrap_estimates).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    samples = np.asarray(samples).ravel()
+    percentile = (1 - confidence_level) * 100
+    estimate = partition_percentile(samples, percentile)
+
+    boot = _resampled_quantiles(samples, percentile, num_resamples, samples.size, rng,
+                                max_block_size)
+    tail = (1 - ci_level) / 2 * 100
+    ci_low, ci_high = np.percentile(boot, [tail, 100 - tail])
+    return estimate, (ci_low, ci_high), boot
+
+
+def subsample_var_ci(samples, confidence_level, subsample_size=None, num_resamples=1000,
+                     ci_level=0.95, rng=None, max_block_size=2**22):
+    """
+    m-out-of-n bootstrap interval for very large N: resamples of only m << n
+    points (default m = n^(2/3)), with the spread rescaled by sqrt(m / n) since
+    the quantile converges at the sqrt(N) rate. Costs m / n of the full bootstrap.
+
+    Returns (estimate, (ci_low, ci_high), subsample_estimates).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    samples = np.asarray(samples).ravel()
+    n = samples.size
+    m = max(100, int(n ** (2 / 3))) if subsample_size is None else int(subsample_size)
+    m = min(m, n)
+    percentile = (1 - confidence_level) * 100
+    estimate = partition_percentile(samples, percentile)
+
+    sub = _resampled_quantiles(samples, percentile, num_resamples, m, rng, max_block_size)
+    # Basic (pivot) interval: theta_hat - sqrt(m / n) * (theta*_m - theta_hat) quantiles
+    tail = (1 - ci_level) / 2 * 100
+    dev_low, dev_high = np.percentile(sub - estimate, [tail, 100 - tail])
+    scale = np.sqrt(m / n)
+    return estimate, (estimate - scale * dev_high, estimate - scale * dev_low), sub
@@ -1,6 +1,19 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+from dataclasses import dataclass
+from statistics import NormalDist
+
 import numpy as np
-import matplotlib.pyplot as plt
-import scipy.stats as stats
+
+from quantiles import BracketQuantile, lerp, linear_index, partition_percentile
+from rng_streams import BACKENDS, experiment_id, trial_generator, trial_normals
+
+# scipy and matplotlib are imported inside the functions that need them, so a
+# single `estimate` from the CLI only pays for numpy.
 
 def calculate_analytical_var(mu, sigma, confidence_level):
     """
@@ -11,74 +24,655 @@ def calculate_analytical_var(mu, sigma, confidence_level):
     """
     # For a return distribution, VaR at alpha (e.g., 95%) usually corresponds to the (1-alpha) quantile.
     # Example: 95% confidence => 5th percentile of returns.
-    return stats.norm.ppf(1 - confidence_level, loc=mu, scale=sigma)
+    return NormalDist(mu, sigma).inv_cdf(1 - confidence_level)
 
-def monte_carlo_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=50):
+def monte_carlo_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=50,
+                               seed=None, max_block_size=2**22, dtype=np.float64,
+                               backend="philox"):
     """
     Runs Monte Carlo simulations for various sample sizes to estimate VaR.
     Averages error over `num_trials` to smooth the curve.
+
+    All trials for a given sample size are drawn as one (trials, n) block and
+    their quantiles are selected in place along axis 1 in a single partition
+    (see quantiles.partition_percentile). `max_block_size`
+    caps the number of samples held in memory at once, so large n is split
+    into chunks of whole trials (at least one trial per chunk).
+
+    Samples are drawn as standard normals and the quantile is mapped back with
+    mu + sigma * q, which skips an affine pass over every sample (order
+    statistics commute with a positive affine map).
+
+    dtype=np.float32 generates and selects in single precision (half the memory
+    traffic); each trial's quantile is widened to float64 before the affine map,
+    so error statistics are always accumulated in float64. See
+    precision_validation for where on the sweep float32 starts to bias results.
+
+    Trial t at sample size n is drawn from trial_generator(experiment, n, t,
+    backend), the same cell parallel_var_simulation computes for that seed,
+    so any one trial can be replayed with replay_trial.
     """
+    experiment = experiment_id(seed)
     analytical_var = calculate_analytical_var(mu, sigma, confidence_level)
+    percentile = (1 - confidence_level) * 100
     
     estimated_vars_means = [] # We'll plot the mean estimated VaR just for viz
     avg_errors = []
     
     print(f"Analytical VaR ({(confidence_level)*100}%): {analytical_var:.6f}")
+    print(f"Experiment id: {experiment} | rng: {backend}")
     
     for n in sample_sizes:
-        current_n_errors = []
-        current_n_vars = []
+        n = int(n)
+        trials_per_block = max(1, min(num_trials, max_block_size // n))
+        estimated_vars = np.empty(num_trials)
         
-        for _ in range(num_trials):
-            # 1. Generate N random returns from N(mu, sigma)
-            returns = np.random.normal(mu, sigma, n)
+        for start in range(0, num_trials, trials_per_block):
+            stop = min(start + trials_per_block, num_trials)
             
-            # 2. Estimate VaR
-            percentile = (1 - confidence_level) * 100
-            estimated_var = np.percentile(returns, percentile)
+            # 1. Generate a (trials, N) block of standard normal shocks
+            z = trial_normals(experiment, n, range(start, stop), backend, dtype)
             
-            # 3. Calculate absolute error
-            error = abs(estimated_var - analytical_var)
-            
-            current_n_vars.append(estimated_var)
-            current_n_errors.append(error)
+            # 2. Estimate VaR for every trial in the block at once
+            z_var = partition_percentile(z, percentile, axis=1, overwrite_input=True)
+            estimated_vars[start:stop] = mu + sigma * z_var.astype(np.float64)
         
-        # Store averages
-        estimated_vars_means.append(np.mean(current_n_vars))
-        avg_errors.append(np.mean(current_n_errors))
+        # 3. Calculate absolute errors and store averages
+        errors = np.abs(estimated_vars - analytical_var)
+        estimated_vars_means.append(np.mean(estimated_vars))
+        avg_errors.append(np.mean(errors))
 
     return analytical_var, estimated_vars_means, avg_errors
 
-def main():
-    # Parameters
-    mu = 0.15        # Annual expected return (15%)
-    sigma = 0.20     # Annual volatility (20%)
-    confidence_level = 0.95 # 95% confidence
-    
-    # Sample sizes to test: logarithmic spacing from 100 to 1,000,000
-    sample_sizes = np.logspace(2, 6, num=50, dtype=int)
-    
-    # Run Simulation
-    analytical_var, estimated_vars, errors = monte_carlo_var_simulation(mu, sigma, confidence_level, sample_sizes)
-    
+def prefix_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=50,
+                          seed=None, max_block_size=2**22, backend="philox"):
+    """
+    Same sweep as monte_carlo_var_simulation, but each trial draws ONE stream of
+    length max(sample_sizes) and every sample size is evaluated on a prefix of it.
+
+    The stream is generated segment by segment (prefix n_i -> n_{i+1}) and never
+    stored whole. Only the smallest M = floor(alpha * (max_n - 1)) + 2 values of
+    the current prefix are kept, sorted: each new segment is reduced to its own
+    smallest M (partition), sorted, and merged in with a stable (run-aware) sort.
+    That is enough to read the two order statistics np.percentile interpolates
+    for every prefix, so each estimate equals np.quantile(prefix, 1 - confidence_level).
+
+    Generation cost drops from sum(sample_sizes) to max(sample_sizes) per trial,
+    and because the estimates are nested the convergence curve is much smoother.
+    Trial t's stream is trial_generator(experiment, max(sample_sizes), t, backend),
+    so the prefix behind any estimate is its first n draws.
+    """
+    experiment = experiment_id(seed)
+    analytical_var = calculate_analytical_var(mu, sigma, confidence_level)
+    q = 1 - confidence_level
+
+    sample_sizes = np.asarray(sample_sizes, dtype=int)
+    order = np.argsort(sample_sizes, kind="stable")
+    sorted_sizes = sample_sizes[order]
+    max_n = int(sorted_sizes[-1])
+    keep = min(max_n, int(linear_index(max_n, q)[0][0]) + 2)
+    max_segment = int(np.max(np.diff(sorted_sizes, prepend=0)))
+
+    print(f"Analytical VaR ({(confidence_level)*100}%): {analytical_var:.6f}")
+    print(f"Experiment id: {experiment} | rng: {backend}")
+
+    estimates = np.empty((num_trials, len(sorted_sizes)))
+    trials_per_block = max(1, min(num_trials, max_block_size // (max_segment + 2 * keep)))
+
+    for start in range(0, num_trials, trials_per_block):
+        stop = min(start + trials_per_block, num_trials)
+        smallest = np.empty((stop - start, 0))
+        prev_n = 0
+        streams = [trial_generator(experiment, max_n, trial, backend) for trial in range(start, stop)]
+
+        for i, n in enumerate(sorted_sizes):
+            n = int(n)
+            segment = np.empty((stop - start, n - prev_n))
+            for row, stream in zip(segment, streams):
+                stream.standard_normal(out=row)
+            if segment.shape[1] > keep:
+                segment.partition(keep - 1, axis=1)
+                segment = segment[:, :keep]
+            segment.sort(axis=1)
+            merged = np.concatenate((smallest, segment), axis=1)
+            smallest = np.sort(merged, axis=1, kind="stable")[:, :keep]
+            prev_n = n
+
+            lower, upper, gamma = linear_index(n, q)
+            z_var = lerp(smallest[:, lower[0]], smallest[:, upper[0]], gamma[0])
+            estimates[start:stop, i] = mu + sigma * z_var
+
+    estimated_vars_means = np.empty(len(sorted_sizes))
+    avg_errors = np.empty(len(sorted_sizes))
+    estimated_vars_means[order] = estimates.mean(axis=0)
+    avg_errors[order] = np.abs(estimates - analytical_var).mean(axis=0)
+
+    return analytical_var, list(estimated_vars_means), list(avg_errors)
+
+def _var_trial_block(task):
+    """
+    Worker for parallel_var_simulation: VaR estimates for trials [t0, t1) of one
+    sample size. Every (size, trial) cell draws from its own counter-based
+    stream trial_generator(experiment, n, trial), so a cell's result does not
+    depend on which worker runs it or on how the grid was chunked.
+    """
+    mu, sigma, percentile, n, experiment, size_index, t0, t1, dtype, backend = task
+    estimates = np.empty(t1 - t0)
+    for j, trial in enumerate(range(t0, t1)):
+        z = trial_generator(experiment, n, trial, backend).standard_normal(n, dtype=dtype)
+        z_var = partition_percentile(z, percentile, overwrite_input=True)
+        estimates[j] = mu + sigma * float(z_var)
+    return estimates
+
+def replay_trial(mu, sigma, confidence_level, sample_size, trial, seed, backend="philox",
+                 dtype=np.float64):
+    """
+    Recomputes the single (sample_size, trial) estimate of a
+    parallel_var_simulation run with the same seed / experiment id and backend,
+    without re-running the rest of the grid.
+    """
+    task = (mu, sigma, (1 - confidence_level) * 100, int(sample_size),
+            experiment_id(seed), 0, trial, trial + 1, dtype, backend)
+    return float(_var_trial_block(task)[0])
+
+def parallel_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=50,
+                            seed=None, workers=None, max_block_size=2**22, dtype=np.float64,
+                            backend="philox"):
+    """
+    monte_carlo_var_simulation spread over a ProcessPoolExecutor.
+
+    The (sample_size, trial) grid is cut into blocks of at most ~max_block_size
+    samples and submitted largest-first for load balance. Results are
+    bit-reproducible for a given `seed` whatever the worker count (see
+    _var_trial_block). workers=None uses every core; workers <= 1 runs the same
+    blocks in-process without starting a pool. `dtype` as in
+    monte_carlo_var_simulation; `backend` is a rng_streams.BACKENDS key.
+
+    The printed experiment id replays any one cell via replay_trial.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    experiment = experiment_id(seed)
+    workers = os.cpu_count() if workers is None else workers
+    analytical_var = calculate_analytical_var(mu, sigma, confidence_level)
+    percentile = (1 - confidence_level) * 100
+
+    print(f"Analytical VaR ({(confidence_level)*100}%): {analytical_var:.6f}")
+    print(f"Experiment id: {experiment} | rng: {backend} | workers: {workers}")
+
+    tasks = []
+    for i, n in enumerate(sample_sizes):
+        n = int(n)
+        trials_per_block = max(1, min(num_trials, max_block_size // n))
+        for t0 in range(0, num_trials, trials_per_block):
+            t1 = min(t0 + trials_per_block, num_trials)
+            tasks.append((mu, sigma, percentile, n, experiment, i, t0, t1, dtype, backend))
+    tasks.sort(key=lambda task: task[3] * (task[7] - task[6]), reverse=True)
+
+    if workers <= 1:
+        blocks = list(map(_var_trial_block, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(_var_trial_block, tasks))
+
+    estimates = np.empty((len(sample_sizes), num_trials))
+    for task, block in zip(tasks, blocks):
+        estimates[task[5], task[6]:task[7]] = block
+
+    estimated_vars_means = list(estimates.mean(axis=1))
+    avg_errors = list(np.abs(estimates - analytical_var).mean(axis=1))
+
+    return analytical_var, estimated_vars_means, avg_errors
+
+def qmc_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=16,
+                       corr=None, weights=None, method="sobol", seed=None,
+                       return_stderr=False):
+    """
+    Quasi-Monte Carlo version of monte_carlo_var_simulation.
+
+    Each of the `num_trials` replicates is an independently scrambled Sobol (or
+    Halton) sequence, pushed through the inverse normal CDF. The spread across
+    replicates gives honest error bars (randomized QMC), while each replicate's
+    error shrinks close to O(1/N) instead of O(1/sqrt(N)). Sobol points keep
+    their balance properties only for N = 2^m, so use power-of-two sample sizes.
+
+    Multi-asset: pass `mu`/`sigma` as length-d vectors, an optional (d, d)
+    correlation matrix `corr` and position `weights` (default equal weights).
+    The estimated quantity is the VaR of the portfolio return w . X, whose
+    analytical value is still Gaussian with mean w . mu and std sqrt(w' S w).
+    The covariance is factored with portfolio_mc.factor_covariance, so a
+    PSD-deficient corr (e.g. perfectly correlated assets) works and the Sobol
+    dimension is its rank rather than d.
+
+    Returns (analytical_var, estimated_vars_means, avg_errors), plus the
+    standard error of the mean estimate per N when return_stderr=True.
+    """
+    from scipy.special import ndtri
+    from scipy.stats import qmc
+
+    from portfolio_mc import factor_covariance
+
+    mu = np.atleast_1d(np.asarray(mu, dtype=float))
+    sigma = np.atleast_1d(np.asarray(sigma, dtype=float))
+    d = max(mu.size, sigma.size)
+    mu = np.broadcast_to(mu, d)
+    sigma = np.broadcast_to(sigma, d)
+    corr = np.eye(d) if corr is None else np.asarray(corr, dtype=float)
+    weights = np.full(d, 1.0 / d) if weights is None else np.asarray(weights, dtype=float)
+
+    # Portfolio return is Gaussian: the shocks only enter through w' L z
+    cov = corr * np.outer(sigma, sigma)
+    factor = factor_covariance(cov)
+    loadings = factor.T @ weights
+    port_mu = float(weights @ mu)
+    port_sigma = float(np.sqrt(weights @ cov @ weights))
+
+    analytical_var = calculate_analytical_var(port_mu, port_sigma, confidence_level)
+    percentile = (1 - confidence_level) * 100
+    engine_cls = {"sobol": qmc.Sobol, "halton": qmc.Halton}[method]
+    seeds = np.random.SeedSequence(seed).spawn(num_trials)
+
+    estimated_vars_means = []
+    avg_errors = []
+    stderrs = []
+
+    print(f"Analytical VaR ({(confidence_level)*100}%): {analytical_var:.6f}")
+
+    for n in sample_sizes:
+        n = int(n)
+        estimates = np.empty(num_trials)
+        for t in range(num_trials):
+            engine = engine_cls(d=factor.shape[1], scramble=True, seed=np.random.default_rng(seeds[t]))
+            z = ndtri(engine.random(n))
+            returns = port_mu + z @ loadings
+            estimates[t] = partition_percentile(returns, percentile, overwrite_input=True)
+
+        estimated_vars_means.append(np.mean(estimates))
+        avg_errors.append(np.mean(np.abs(estimates - analytical_var)))
+        stderrs.append(np.std(estimates, ddof=1) / np.sqrt(num_trials))
+
+    if return_stderr:
+        return analytical_var, estimated_vars_means, avg_errors, stderrs
+    return analytical_var, estimated_vars_means, avg_errors
+
+def importance_sampling_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=50,
+                                       shift=None, seed=None, max_block_size=2**22,
+                                       backend="philox"):
+    """
+    Tail importance-sampling version of monte_carlo_var_simulation.
+
+    Standard normal shocks are drawn from the mean-shifted proposal N(theta, 1)
+    (for a Gaussian this is the same as exponential tilting) and reweighted by
+    the likelihood ratio w(z) = exp(-theta * z + theta^2 / 2). The VaR is the
+    smallest z whose weighted CDF (1/N) * sum_i w_i 1{z_i <= z} reaches
+    alpha = 1 - confidence_level, found for a whole (trials, n) block at once by
+    sorting, cumulative-summing the weights and counting along axis 1.
+
+    By default theta = Phi^-1(alpha), i.e. the proposal is centred on the target
+    quantile, which puts about half the samples in the tail instead of alpha.
+    Trial t at size n uses the same stream as monte_carlo_var_simulation's
+    cell (n, t), so for one seed the two sweeps share common random numbers.
+    """
+    experiment = experiment_id(seed)
+    analytical_var = calculate_analytical_var(mu, sigma, confidence_level)
+    alpha = 1 - confidence_level
+    theta = NormalDist().inv_cdf(alpha) if shift is None else shift
+
+    estimated_vars_means = []
+    avg_errors = []
+
+    print(f"Analytical VaR ({(confidence_level)*100}%): {analytical_var:.6f}")
+    print(f"Importance sampling shift theta = {theta:.4f}")
+    print(f"Experiment id: {experiment} | rng: {backend}")
+
+    for n in sample_sizes:
+        n = int(n)
+        trials_per_block = max(1, min(num_trials, max_block_size // n))
+        estimated_vars = np.empty(num_trials)
+
+        for start in range(0, num_trials, trials_per_block):
+            stop = min(start + trials_per_block, num_trials)
+
+            # 1. Draw shocks from the tilted proposal and sort each trial
+            z = trial_normals(experiment, n, range(start, stop), backend)
+            z += theta
+            z.sort(axis=1)
+
+            # 2. Weighted CDF inversion along axis 1
+            weighted_cdf = np.cumsum(np.exp(theta * theta / 2 - theta * z), axis=1)
+            idx = np.minimum((weighted_cdf < alpha * n).sum(axis=1), n - 1)
+            estimated_vars[start:stop] = mu + sigma * z[np.arange(stop - start), idx]
+
+        errors = np.abs(estimated_vars - analytical_var)
+        estimated_vars_means.append(np.mean(estimated_vars))
+        avg_errors.append(np.mean(errors))
+
+    return analytical_var, estimated_vars_means, avg_errors
+
+@dataclass
+class SequentialVaRResult:
+    # Field names mirror the IQAE result (estimation / confidence_interval)
+    estimation: float
+    confidence_interval: tuple
+    num_samples: int
+    num_batches: int
+
+def order_statistic_interval(n, q, delta):
+    """
+    Distribution-free (1 - delta) confidence interval for the q-quantile from n
+    iid samples: 0-based ranks (lo, hi) such that
+    P(X_(lo) <= x_q <= X_(hi)) >= 1 - delta, from the Binomial(n, q) count of
+    samples below x_q. Either rank is None if n is too small to bound that side.
+    """
+    from scipy.stats import binom
+    lo = int(binom.ppf(delta / 2, n, q)) - 1
+    hi = int(binom.ppf(1 - delta / 2, n, q))
+    return (lo if lo >= 0 else None), (hi if hi <= n - 1 else None)
+
+def sequential_monte_carlo_var(mu, sigma, confidence_level, epsilon, alpha=0.01,
+                               initial_batch=1000, max_samples=10**9, seed=None, trial=0,
+                               max_block_size=2**22, backend="philox"):
+    """
+    Adaptive-stopping MC VaR: "VaR to +/- epsilon with probability 1 - alpha".
+
+    Batches are drawn with geometric growth (the total doubles each look) and
+    after every look an exact binomial order-statistic interval for the quantile
+    is formed; sampling stops once its half-width is <= epsilon. Look k uses
+    failure probability alpha * 6 / (pi^2 k^2), so the union over all looks
+    still holds with probability >= 1 - alpha. The estimate is the interval
+    midpoint, so |estimation - VaR| <= epsilon whenever the interval covers.
+
+    Samples are generated in blocks of at most max_block_size and streamed
+    into a BracketQuantile, which only keeps the O(sqrt(n)) samples near the
+    quantile, so memory stays bounded even at max_samples = 1e9. The run is
+    one open-ended stream, trial_generator(experiment, 0, trial, backend)
+    (sample-size key 0), so a run is replayed from (seed, trial) alone.
+
+    `epsilon` / `alpha` have the same meaning as in iqae.run(epsilon=..., alpha=...),
+    except epsilon is in return units here rather than probability units.
+    Returns a SequentialVaRResult.
+    """
+    rng = trial_generator(experiment_id(seed), 0, trial, backend)
+    q = 1 - confidence_level
+    max_samples = int(max_samples)
+
+    # Bracket of +/- 10 sd in rank: wider than any interval the looks can ask for
+    summary = BracketQuantile(q, z=10.0)
+    batch = min(int(initial_batch), max_samples)
+    look = 0
+    while True:
+        look += 1
+        for start in range(0, batch, max_block_size):
+            size = min(max_block_size, batch - start)
+            summary.update(mu + sigma * rng.standard_normal(size))
+        n = summary.n
+
+        delta_k = alpha * 6 / (np.pi**2 * look**2)
+        lo, hi = order_statistic_interval(n, q, delta_k)
+        ci = (-np.inf, np.inf)
+        if lo is not None and hi is not None:
+            bounds = summary.order_statistics([lo, hi])
+            if bounds is not None:
+                ci = (float(bounds[0]), float(bounds[1]))
+        if (ci[1] - ci[0]) / 2 <= epsilon or n >= max_samples:
+            break
+        batch = min(n, max_samples - n)
+
+    if np.isfinite(ci[0]) and np.isfinite(ci[1]):
+        estimate = (ci[0] + ci[1]) / 2
+    else:
+        estimate = float(summary.value())
+    return SequentialVaRResult(float(estimate), ci, n, look)
+
+def precision_validation(mu, sigma, confidence_level, sample_sizes, num_trials=200,
+                         seed=None, max_block_size=2**22, backend="philox"):
+    """
+    Shows where on the sweep float32 sampling starts to bias the VaR estimate.
+
+    For every N both precisions run the num_trials cells (N, t) of
+    monte_carlo_var_simulation for this seed, i.e. exactly what the sweep
+    produces with dtype=np.float64 and dtype=np.float32. The mean of the
+    paired differences is compared with its standard error (valid however the
+    two draws of a cell are correlated): |z| well above ~3 means float32 bias
+    is visible at that N.
+    `rounding_bias` isolates pure storage rounding by also evaluating the
+    float64 draws after a cast to float32. The float32 grid spacing at the
+    VaR (`resolution`) is the floor no N can beat.
+
+    Returns a list of dict rows (one per N) and prints them as a table.
+    """
+    experiment = experiment_id(seed)
+    analytical_var = calculate_analytical_var(mu, sigma, confidence_level)
+    percentile = (1 - confidence_level) * 100
+    z_target = (analytical_var - mu) / sigma
+    resolution = sigma * abs(float(np.spacing(np.float32(z_target))))
+
+    rows = []
+    print(f"Experiment id: {experiment} | rng: {backend}")
+    print("N,mean64,mean32,diff,stderr,z,rounding_bias,resolution")
+    for n in sample_sizes:
+        n = int(n)
+        trials_per_block = max(1, min(num_trials, max_block_size // n))
+        est64 = np.empty(num_trials)
+        est64_cast = np.empty(num_trials)
+        est32 = np.empty(num_trials)
+        for start in range(0, num_trials, trials_per_block):
+            stop = min(start + trials_per_block, num_trials)
+            z64 = trial_normals(experiment, n, range(start, stop), backend)
+            est64_cast[start:stop] = partition_percentile(z64.astype(np.float32), percentile,
+                                                          axis=1, overwrite_input=True)
+            est64[start:stop] = partition_percentile(z64, percentile, axis=1, overwrite_input=True)
+            z32 = trial_normals(experiment, n, range(start, stop), backend, np.float32)
+            est32[start:stop] = partition_percentile(z32, percentile, axis=1, overwrite_input=True)
+
+        est64 = mu + sigma * est64
+        est32 = mu + sigma * est32
+        est64_cast = mu + sigma * est64_cast
+        diff = est32.mean() - est64.mean()
+        stderr = np.std(est32 - est64, ddof=1) / np.sqrt(num_trials)
+        row = {
+            "N": n,
+            "mean64": est64.mean(),
+            "mean32": est32.mean(),
+            "diff": diff,
+            "stderr": stderr,
+            "z": diff / stderr if stderr > 0 else 0.0,
+            "rounding_bias": np.mean(est64_cast - est64),
+            "resolution": resolution,
+        }
+        rows.append(row)
+        print(",".join(f"{v:.6g}" for v in row.values()))
+
+    return rows
+
+def expected_abs_error(dist, confidence_level, sample_sizes):
+    """
+    Closed-form expected absolute error of the N-sample VaR quantile.
+
+    The sample alpha-quantile is asymptotically N(q, alpha (1 - alpha) / (N f(q)^2))
+    (Bahadur), so E|q_hat - q| = sqrt(2 / pi) * sqrt(alpha (1 - alpha) / N) / f(q).
+    `dist` is any frozen scipy.stats distribution (pdf + ppf).
+    """
+    alpha = 1 - confidence_level
+    q = dist.ppf(alpha)
+    sd = np.sqrt(alpha * (1 - alpha) / np.asarray(sample_sizes, dtype=float)) / dist.pdf(q)
+    return np.sqrt(2 / np.pi) * sd
+
+def error_model_analysis(confidence_level, sample_sizes, dist=None, num_trials=5,
+                         seed=None, max_block_size=2**22, backend="philox"):
+    """
+    Predicts the average absolute error at every N analytically and validates it
+    with only `num_trials` replicates (instead of the usual 50) drawn from `dist`
+    (a frozen scipy.stats distribution; defaults to the N(0.15, 0.20) model).
+
+    Returns (analytical_var, predicted_errors, observed_errors). The observed
+    curve is noisy with so few replicates; the prediction is what gets plotted.
+    Replicate t at size n samples `dist` from trial_generator(experiment, n, t).
+    """
+    import scipy.stats as stats
+    experiment = experiment_id(seed)
+    dist = stats.norm(0.15, 0.20) if dist is None else dist
+    analytical_var = float(dist.ppf(1 - confidence_level))
+    percentile = (1 - confidence_level) * 100
+    predicted_errors = list(expected_abs_error(dist, confidence_level, sample_sizes))
+
+    observed_errors = []
+    for n in sample_sizes:
+        n = int(n)
+        trials_per_block = max(1, min(num_trials, max_block_size // n))
+        estimates = np.empty(num_trials)
+        for start in range(0, num_trials, trials_per_block):
+            stop = min(start + trials_per_block, num_trials)
+            samples = np.stack([dist.rvs(size=n, random_state=trial_generator(
+                experiment, n, trial, backend)) for trial in range(start, stop)])
+            estimates[start:stop] = partition_percentile(samples, percentile, axis=1,
+                                                         overwrite_input=True)
+        observed_errors.append(np.mean(np.abs(estimates - analytical_var)))
+
+    return analytical_var, predicted_errors, observed_errors
+
+MODES = {
+    # mode: (plot label, plot name, default output file)
+    "mc": ('MC', 'Monte Carlo', 'monte_carlo_convergence.png'),
+    "prefix": ('Prefix MC', 'Prefix-Reuse Monte Carlo', 'prefix_convergence.png'),
+    "qmc": ('QMC', 'Quasi-Monte Carlo', 'qmc_convergence.png'),
+    "is": ('IS', 'Importance Sampling', 'importance_sampling_convergence.png'),
+    "theory": ('Order-statistic model', 'Order-Statistic Error Model', 'error_model_convergence.png'),
+}
+
+def run_sweep(args):
+    """Runs the convergence sweep selected by args.mode and returns it as a plain dict."""
+    if args.sample_sizes:
+        sample_sizes = np.array(args.sample_sizes, dtype=int)
+    elif args.mode == "qmc":
+        # Sobol needs N = 2^m: 128 to ~1,000,000
+        sample_sizes = 2 ** np.arange(7, 21)
+    else:
+        # Sample sizes to test: logarithmic spacing from 100 to 1,000,000
+        sample_sizes = np.logspace(2, 6, num=50, dtype=int)
+
+    mu, sigma, confidence_level = args.mu, args.sigma, args.confidence
+    observed = None
+    if args.mode == "qmc":
+        analytical_var, estimated_vars, errors = qmc_var_simulation(
+            mu, sigma, confidence_level, sample_sizes, num_trials=args.trials or 16, seed=args.seed
+        )
+    elif args.mode == "is":
+        analytical_var, estimated_vars, errors = importance_sampling_var_simulation(
+            mu, sigma, confidence_level, sample_sizes, num_trials=args.trials or 50,
+            seed=args.seed, backend=args.rng
+        )
+    elif args.mode == "prefix":
+        analytical_var, estimated_vars, errors = prefix_var_simulation(
+            mu, sigma, confidence_level, sample_sizes, num_trials=args.trials or 50,
+            seed=args.seed, backend=args.rng
+        )
+    elif args.mode == "theory":
+        import scipy.stats as stats
+        analytical_var, errors, observed = error_model_analysis(
+            confidence_level, sample_sizes, dist=stats.norm(mu, sigma),
+            num_trials=args.trials or 5, seed=args.seed, backend=args.rng
+        )
+        estimated_vars = [analytical_var] * len(sample_sizes)
+    else:
+        analytical_var, estimated_vars, errors = parallel_var_simulation(
+            mu, sigma, confidence_level, sample_sizes, num_trials=args.trials or 50,
+            seed=args.seed, workers=args.workers, dtype=np.dtype(args.precision),
+            backend=args.rng
+        )
+
+    result = {
+        "mode": args.mode,
+        "mu": mu,
+        "sigma": sigma,
+        "confidence_level": confidence_level,
+        "analytical_var": float(analytical_var),
+        "sample_sizes": [int(n) for n in sample_sizes],
+        "estimated_vars": [float(v) for v in estimated_vars],
+        "avg_errors": [float(e) for e in errors],
+    }
+    if observed is not None:
+        result["observed_errors"] = [float(e) for e in observed]
+    return result
+
+def write_result(result, fmt, output):
+    """Writes a result dict as JSON, or (for sweeps) one CSV row per sample size."""
+    out = sys.stdout if output in (None, "-") else open(output, "w", newline="")
+    try:
+        if fmt == "json":
+            json.dump(result, out, indent=2)
+            out.write("\n")
+        else:
+            per_n = [k for k, v in result.items() if isinstance(v, list)]
+            scalars = [k for k, v in result.items() if not isinstance(v, list)]
+            writer = csv.writer(out)
+            if per_n:
+                writer.writerow(scalars + per_n)
+                for row in zip(*(result[k] for k in per_n)):
+                    writer.writerow([result[k] for k in scalars] + list(row))
+            else:
+                writer.writerow(scalars)
+                writer.writerow([result[k] for k in scalars])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def read_result(path):
+    """Reads a sweep written by write_result (JSON or CSV) back into a dict."""
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        rows = list(csv.DictReader(f))
+    result = {k: rows[0][k] for k in ("mode",)}
+    for k in ("mu", "sigma", "confidence_level", "analytical_var"):
+        result[k] = float(rows[0][k])
+    for k in ("sample_sizes", "estimated_vars", "avg_errors", "observed_errors"):
+        if k in rows[0]:
+            result[k] = [float(r[k]) for r in rows]
+    result["sample_sizes"] = [int(n) for n in result["sample_sizes"]]
+    return result
+
+def plot_convergence(result, out_file=None):
+    """Three-panel convergence figure for a sweep result dict; matplotlib is imported here."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import scipy.stats as stats
+
+    mode = result["mode"]
+    label, name, default_file = MODES[mode]
+    out_file = default_file if out_file is None else out_file
+    mu, sigma = result["mu"], result["sigma"]
+    confidence_level = result["confidence_level"]
+    analytical_var = result["analytical_var"]
+    sample_sizes = np.array(result["sample_sizes"])
+    estimated_vars = result["estimated_vars"]
+    errors = result["avg_errors"]
+
     # Plotting
     plt.figure(figsize=(12, 15))
     
     # Subplot 1: Convergence of VaR estimate
     plt.subplot(3, 1, 1)
-    plt.plot(sample_sizes, estimated_vars, label='MC Estimated VaR', color='blue', alpha=0.7)
+    plt.plot(sample_sizes, estimated_vars, label=f'{label} Estimated VaR', color='blue', alpha=0.7)
     plt.axhline(y=analytical_var, color='red', linestyle='--', label=f'Analytical VaR ({analytical_var:.5f})')
     plt.xscale('log')
     plt.xlabel('Number of Samples (N)')
     plt.ylabel('VaR Limit (Return)')
-    plt.title(f'Convergence of Monte Carlo VaR Estimate (Confidence: {confidence_level*100}%)')
+    plt.title(f'Convergence of {name} VaR Estimate (Confidence: {confidence_level*100}%)')
     plt.legend()
     plt.grid(True, which="both", ls="-", alpha=0.2)
     
     # Subplot 2: Error Scaling (Log-Log Plot)
     plt.subplot(3, 1, 2)
     plt.loglog(sample_sizes, errors, 'o', label='Average Absolute Error', markersize=4, color='green')
-    
+    if "observed_errors" in result:
+        plt.loglog(sample_sizes, result["observed_errors"], 'x', label='Observed (few replicates)',
+                   markersize=4, color='gray')
+    elif mode != "qmc":
+        # Closed-form MC prediction (exact asymptotically for MC; IS should sit below it)
+        plt.plot(sample_sizes, expected_abs_error(stats.norm(mu, sigma), confidence_level, sample_sizes),
+                 'b-', alpha=0.5, label='Order-statistic theory')
     # Fit a reference line for O(1/sqrt(N)) => log(Err) ~ -0.5 * log(N) + C
     log_N = np.log(sample_sizes)
     log_Err = np.log(errors)
@@ -94,7 +688,7 @@ def main():
 
     plt.xlabel('Number of Samples (N)')
     plt.ylabel('Average Absolute Error')
-    plt.title(f'Monte Carlo Error Scaling (Averaged over separate trials)')
+    plt.title(f'{name} Error Scaling (Averaged over separate trials)')
     plt.legend()
     plt.grid(True, which="both", ls="-", alpha=0.2)
 
@@ -116,8 +710,98 @@ def main():
     plt.grid(True, alpha=0.2)
     
     plt.tight_layout()
-    plt.savefig('monte_carlo_convergence.png')
-    print("Plots saved to monte_carlo_convergence.png")
+    plt.savefig(out_file)
+    plt.close()
+    print(f"Plots saved to {out_file}", file=sys.stderr)
+
+def run_estimate(args):
+    """
+    Single VaR estimate from one N-sample Monte Carlo run. With the same seed,
+    --trial and --rng it reproduces cell (N, trial) of `sweep --mode mc`.
+    """
+    experiment = experiment_id(args.seed)
+    z = trial_generator(experiment, args.samples, args.trial, args.rng).standard_normal(args.samples)
+    estimate = args.mu + args.sigma * float(partition_percentile(
+        z, (1 - args.confidence) * 100, overwrite_input=True))
+    analytical_var = calculate_analytical_var(args.mu, args.sigma, args.confidence)
+    return {
+        "mu": args.mu,
+        "sigma": args.sigma,
+        "confidence_level": args.confidence,
+        "num_samples": args.samples,
+        "seed": experiment,
+        "trial": args.trial,
+        "rng": args.rng,
+        "estimated_var": estimate,
+        "analytical_var": analytical_var,
+        "abs_error": abs(estimate - analytical_var),
+    }
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Classical Monte Carlo VaR baseline")
+    commands = parser.add_subparsers(dest="command")
+
+    def add_model_args(sub):
+        sub.add_argument("--mu", type=float, default=0.15, help="mean return (default 0.15)")
+        sub.add_argument("--sigma", type=float, default=0.20, help="return volatility (default 0.20)")
+        sub.add_argument("--confidence", type=float, default=0.95, help="VaR confidence level")
+        sub.add_argument("--seed", type=int, default=None,
+                         help="root seed; results are identical for any --workers")
+        sub.add_argument("--rng", choices=list(BACKENDS), default="philox",
+                         help="counter-based stream per (seed, sample size, trial) cell")
+
+    def add_sweep_args(sub):
+        add_model_args(sub)
+        sub.add_argument("--mode", choices=list(MODES), default="mc",
+                         help="pseudo-random MC, prefix-reuse MC, scrambled-Sobol QMC, tail "
+                              "importance sampling, or the closed-form error model checked "
+                              "against a few replicates")
+        sub.add_argument("--sample-sizes", type=int, nargs="+", default=None,
+                         help="sample sizes to sweep (default: 50 log-spaced from 1e2 to 1e6)")
+        sub.add_argument("--trials", type=int, default=None,
+                         help="trials per sample size (default depends on --mode)")
+        sub.add_argument("--workers", type=int, default=1,
+                         help="worker processes for --mode mc (<= 1 runs in-process)")
+        sub.add_argument("--precision", choices=["float64", "float32"], default="float64",
+                         help="sample precision for --mode mc (float32 halves memory traffic)")
+
+    estimate = commands.add_parser("estimate", help="one VaR estimate, written as JSON/CSV")
+    add_model_args(estimate)
+    estimate.add_argument("--samples", type=int, default=10**6, help="number of MC samples")
+    estimate.add_argument("--trial", type=int, default=0,
+                          help="trial index, to replay one cell of a --mode mc sweep")
+    estimate.add_argument("--format", choices=["json", "csv"], default="json")
+    estimate.add_argument("--output", default=None, help="output file (default stdout)")
+
+    sweep = commands.add_parser("sweep", help="convergence sweep, written as JSON/CSV")
+    add_sweep_args(sweep)
+    sweep.add_argument("--format", choices=["json", "csv"], default="json")
+    sweep.add_argument("--output", default=None, help="output file (default stdout)")
+
+    plot = commands.add_parser("plot", help="convergence sweep rendered to PNG")
+    add_sweep_args(plot)
+    plot.add_argument("--input", default=None,
+                      help="plot a saved sweep (.json or .csv) instead of running one")
+    plot.add_argument("--output", default=None, help="PNG path (default depends on --mode)")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # No subcommand keeps the original behaviour: run the default sweep and plot it
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["plot"] + list(argv)
+    args = build_parser().parse_args(argv)
+
+    if args.command == "estimate":
+        write_result(run_estimate(args), args.format, args.output)
+    elif args.command == "sweep":
+        # Progress prints go to stderr so stdout stays machine-readable
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_sweep(args)
+        write_result(result, args.format, args.output)
+    else:
+        result = read_result(args.input) if args.input else run_sweep(args)
+        plot_convergence(result, args.output)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,123 @@
+import numpy as np
+
+from monte_carlo_var import calculate_analytical_var
+from quantiles import var_quantiles
+from rng_streams import experiment_id, trial_generator
+
+
+def factor_covariance(cov, tol=1e-12):
+    """
+    Returns a (d, r) factor L with L @ L.T == cov.
+
+    Cholesky when cov is positive definite (r = d). Otherwise falls back to an
+    eigendecomposition and keeps only eigenvalues above tol * max eigenvalue, so
+    a PSD-deficient covariance (e.g. estimated from fewer days than factors)
+    gives a thinner factor and fewer random draws per scenario.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        keep = eigvals > tol * max(eigvals[-1], 0.0)
+        return eigvecs[:, keep] * np.sqrt(eigvals[keep])
+
+
+def scenario_chunks(mean, factor, num_scenarios, chunk_size, rng):
+    """Yields (chunk, d) scenario blocks mean + z @ L.T without ever holding all of them."""
+    remaining = int(num_scenarios)
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        z = rng.standard_normal(size=(size, factor.shape[1]))
+        yield mean + z @ factor.T
+        remaining -= size
+
+
+def scenario_source(mean, cov, num_scenarios, seed=None, trial=0, max_block_size=2**22,
+                    backend="philox"):
+    """
+    Replayable scenario matrix X ~ N(mean, cov) that is never materialized:
+    returns chunks(), and every call of chunks() regenerates the same (chunk, d)
+    blocks from trial_generator(experiment, num_scenarios, trial, backend).
+
+    These are exactly the scenarios portfolio_pnl(revalue=...) revalues for the
+    same seed, trial and backend, so a second consumer (e.g.
+    risk_attribution.euler_attribution) can make extra passes over the
+    scenarios behind a quantile in O(max_block_size) memory.
+    """
+    experiment = experiment_id(seed)
+    mean = np.asarray(mean, dtype=np.float64)
+    factor = factor_covariance(cov)
+    chunk_size = max(1, max_block_size // max(factor.shape[0], factor.shape[1]))
+
+    def chunks():
+        rng = trial_generator(experiment, num_scenarios, trial, backend)
+        return scenario_chunks(mean, factor, num_scenarios, chunk_size, rng)
+
+    return chunks
+
+
+def portfolio_pnl(mean, cov, weights, num_scenarios, revalue=None, seed=None, trial=0,
+                  max_block_size=2**22, backend="philox"):
+    """
+    Simulated portfolio P&L for correlated risk factors X ~ N(mean, cov).
+
+    With revalue=None the book is linear, P&L = X @ weights, which is exactly
+    N(w . mean, w' cov w): one normal per scenario is drawn and scaled, with
+    no covariance factorization and no per-factor draws. (For the VaR itself
+    analytical_portfolio_var gives the same number in closed form; the
+    simulated path is for sampling-error studies.)
+
+    Pass revalue(scenarios) -> pnl for non-linear books. The covariance is then
+    factored once and scenarios are generated in (chunk, d) blocks of at most
+    max_block_size numbers (see scenario_source), reduced straight to P&L, so
+    only the (num_scenarios,) P&L vector is kept.
+
+    Draws come from trial_generator(experiment, num_scenarios, trial, backend),
+    the cell a monte_carlo_var_simulation sweep would use, so a run is
+    replayed from (seed, trial) alone.
+    """
+    experiment = experiment_id(seed)
+    mean = np.asarray(mean, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    pnl = np.empty(int(num_scenarios))
+    if revalue is None:
+        cov = np.asarray(cov, dtype=np.float64)
+        port_sigma = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+        base = float(weights @ mean)
+        rng = trial_generator(experiment, num_scenarios, trial, backend)
+        for start in range(0, pnl.size, max_block_size):
+            stop = min(start + max_block_size, pnl.size)
+            pnl[start:stop] = base + port_sigma * rng.standard_normal(stop - start)
+    else:
+        chunks = scenario_source(mean, cov, num_scenarios, seed=experiment, trial=trial,
+                                 max_block_size=max_block_size, backend=backend)
+        start = 0
+        for scenarios in chunks():
+            pnl[start:start + scenarios.shape[0]] = revalue(scenarios)
+            start += scenarios.shape[0]
+    return pnl
+
+
+def analytical_portfolio_var(mean, cov, weights, confidence_level):
+    """Gaussian VaR (return threshold) of the linear portfolio w . X."""
+    weights = np.asarray(weights, dtype=np.float64)
+    port_mu = float(weights @ np.asarray(mean, dtype=np.float64))
+    port_sigma = float(np.sqrt(weights @ np.asarray(cov, dtype=np.float64) @ weights))
+    return calculate_analytical_var(port_mu, port_sigma, confidence_level)
+
+
+def portfolio_monte_carlo_var(mean, cov, weights, confidence_level, num_scenarios,
+                              revalue=None, seed=None, trial=0, max_block_size=2**22,
+                              backend="philox"):
+    """
+    Portfolio counterpart of a single monte_carlo_var_simulation trial.
+    `confidence_level` may be a list; all levels share one partition pass.
+    Returns (estimated_var, pnl).
+    """
+    experiment = experiment_id(seed)
+    print(f"Experiment id: {experiment} | rng: {backend} | trial: {trial}")
+    pnl = portfolio_pnl(mean, cov, weights, num_scenarios, revalue=revalue, seed=experiment,
+                        trial=trial, max_block_size=max_block_size, backend=backend)
+    return var_quantiles(pnl, confidence_level), pnl
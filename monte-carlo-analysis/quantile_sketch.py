@@ -0,0 +1,222 @@
+import warnings
+
+import numpy as np
+
+from monte_carlo_var import calculate_analytical_var
+from quantiles import BracketQuantile
+from rng_streams import experiment_id, trial_generator
+
+
+class CompactorSketch:
+    """
+    Mergeable quantile sketch (KLL-style hierarchy of compactors) with a tracked,
+    deterministic rank-error bound.
+
+    Level h holds sorted-then-halved items of weight 2^h. When a level reaches
+    `k` items it is sorted and every other item (random offset) is promoted to
+    level h+1. A single compaction moves the estimated rank of any value by at
+    most its weight 2^h, so summing the weights of all compactions performed
+    gives a hard bound on |estimated rank - true rank| for every query.
+
+    Memory is O(k log2(N / k)) floats: with k = 2^14 that is a few MB even at
+    N = 1e10. Incoming chunks are buffered as a list and only joined into
+    level 0 once they add up to k items, so each sample is copied O(1) times
+    before its first compaction.
+    """
+
+    def __init__(self, k=2**14, rng=None):
+        self.k = int(k)
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.rank_error = 0  # absolute rank error bound, in samples
+        self._pending = []
+        self._pending_size = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self._pending.append(values)
+        self._pending_size += values.size
+        self.n += values.size
+        if self.levels[0].size + self._pending_size >= self.k:
+            self._flush()
+            self._compress()
+
+    def _flush(self):
+        if self._pending:
+            self.levels[0] = np.concatenate([self.levels[0]] + self._pending)
+            self._pending = []
+            self._pending_size = 0
+
+    def merge(self, other):
+        self._flush()
+        other._flush()
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate((self.levels[h], items))
+        self.n += other.n
+        self.rank_error += other.rank_error
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size >= self.k:
+                items = np.sort(items)
+                # Odd leftover stays behind so the compacted part has even size
+                keep = items[-1:] if items.size % 2 else items[:0]
+                body = items[:items.size - keep.size]
+                offset = int(self.rng.integers(2))
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate((self.levels[h + 1], body[offset::2]))
+                self.levels[h] = keep
+                self.rank_error += 2**h
+            h += 1
+
+    def _sorted_items(self):
+        self._flush()
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lvl.size, 2**h, dtype=np.int64)
+                                  for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Smallest sketch item whose estimated rank reaches q * n (inverted CDF)."""
+        items, cum_weights = self._sorted_items()
+        target = np.clip(np.asarray(q, dtype=np.float64), 0, 1) * self.n
+        idx = np.searchsorted(cum_weights, target, side="left")
+        return items[np.minimum(idx, items.size - 1)]
+
+    @property
+    def normalized_rank_error(self):
+        """Rank error bound as a fraction of n (epsilon in the usual sketch notation)."""
+        return self.rank_error / self.n if self.n else 0.0
+
+
+def sketch_k(num_samples, confidence_level, fraction=0.25):
+    """
+    Compactor size k (a power of two) for which the CompactorSketch rank-error
+    bound, about 2 log2(N / k) / k, stays below `fraction` of the sampling
+    standard error sqrt(alpha (1 - alpha) / N) of the empirical quantile.
+
+    That makes k grow like sqrt(N) log N (2^23 at N = 1e9, 2^25 at 1e10): a
+    sketch that does not swamp the MC error is not constant-memory.
+    """
+    alpha = 1 - confidence_level
+    target = fraction * np.sqrt(alpha * (1 - alpha) / num_samples)
+    k = 2**10
+    while 2 * max(np.log2(num_samples / k), 1) / k > target:
+        k *= 2
+    return k
+
+
+def _stream_var(mu, sigma, confidence_level, num_samples, experiment, trial, backend,
+                chunk_size, method, k, z):
+    """streaming_monte_carlo_var for one (num_samples, trial) cell of an experiment."""
+    alpha = 1 - confidence_level
+    num_samples = int(num_samples)
+
+    def stream(summary):
+        # Rebuilt per pass, so a bracket retry replays the very same samples
+        rng = trial_generator(experiment, num_samples, trial, backend)
+        remaining = num_samples
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            summary.update(mu + sigma * rng.standard_normal(size))
+            remaining -= size
+
+    if method == "bracket":
+        while True:
+            summary = BracketQuantile(alpha, z=z)
+            stream(summary)
+            var_est = summary.value()
+            if var_est is not None:
+                return float(var_est), (float(var_est), float(var_est)), 0.0
+            # One retry with a wider bracket, then an untightened (full) buffer
+            z = z * 2 if z < 16 else np.inf
+
+    if method != "sketch":
+        raise ValueError(f"unknown method {method!r}")
+    # The compactor coin flips get their own stream, keyed by the same cell
+    coins = np.random.default_rng([experiment, num_samples, trial])
+    sketch = CompactorSketch(k=sketch_k(num_samples, confidence_level) if k is None else k,
+                             rng=coins)
+    stream(sketch)
+    eps = sketch.normalized_rank_error
+    sampling_error = np.sqrt(alpha * (1 - alpha) / num_samples)
+    if eps > sampling_error:
+        warnings.warn(f"sketch rank error {eps:.2e} exceeds the sampling error "
+                      f"{sampling_error:.2e} at N={num_samples}; increase k or use "
+                      f"method='bracket'", RuntimeWarning, stacklevel=3)
+    var_low, var_est, var_high = sketch.quantile([alpha - eps, alpha, alpha + eps])
+    return float(var_est), (float(var_low), float(var_high)), float(eps)
+
+
+def streaming_monte_carlo_var(mu, sigma, confidence_level, num_samples, chunk_size=2**20,
+                              method="bracket", k=None, z=8.0, seed=None, trial=0,
+                              backend="philox"):
+    """
+    Monte Carlo VaR with memory independent of num_samples (up to O(sqrt(N))):
+    samples are generated `chunk_size` at a time and streamed into a quantile
+    summary, so num_samples can go far past RAM.
+
+    The samples are cell (num_samples, trial) of monte_carlo_var_simulation,
+    trial_generator(experiment, num_samples, trial, backend), drawn chunk by
+    chunk from the one stream.
+
+    method="bracket" (default) uses BracketQuantile and returns the exact
+    empirical quantile of all samples, so the only error left is Monte Carlo
+    error. On the rare bracket miss the cell's stream is regenerated and
+    replayed with twice the z.
+
+    method="sketch" uses a CompactorSketch with k = sketch_k(N) unless given,
+    and warns when its rank-error bound exceeds the sampling error, since the
+    curve then flattens on sketch error rather than measuring MC convergence.
+    With the default k its memory and sort work are O(sqrt(N) log N), like
+    the bracket's O(sqrt(N)) buffer but larger and only approximate; a fixed
+    small k is constant-memory but its error dominates at large N. Both
+    methods return Python floats.
+
+    Returns (var_estimate, (var_low, var_high), rank_error) where rank_error is
+    the summary's rank-error bound as a fraction of num_samples (0 for the
+    bracket) and (var_low, var_high) brackets the exact empirical quantile.
+    """
+    experiment = experiment_id(seed)
+    print(f"Experiment id: {experiment} | rng: {backend} | trial: {trial}")
+    return _stream_var(mu, sigma, confidence_level, num_samples, experiment, trial, backend,
+                       chunk_size, method, k, z)
+
+
+def streaming_var_simulation(mu, sigma, confidence_level, sample_sizes, num_trials=10,
+                             chunk_size=2**20, method="bracket", k=None, seed=None,
+                             backend="philox"):
+    """
+    Streaming counterpart of monte_carlo_var_simulation (same return tuple), for
+    sample sizes beyond what fits in memory. Cell (n, t) is drawn from the same
+    stream as in monte_carlo_var_simulation, so for one seed both sweeps give
+    the same estimates (up to rounding) and any cell is replayed with
+    streaming_monte_carlo_var(..., n, seed=experiment, trial=t).
+    """
+    experiment = experiment_id(seed)
+    analytical_var = calculate_analytical_var(mu, sigma, confidence_level)
+
+    estimated_vars_means = []
+    avg_errors = []
+
+    print(f"Analytical VaR ({(confidence_level)*100}%): {analytical_var:.6f}")
+    print(f"Experiment id: {experiment} | rng: {backend}")
+
+    for n in sample_sizes:
+        estimates = np.array([
+            _stream_var(mu, sigma, confidence_level, n, experiment, trial, backend,
+                        chunk_size, method, k, 8.0)[0]
+            for trial in range(num_trials)
+        ])
+        estimated_vars_means.append(np.mean(estimates))
+        avg_errors.append(np.mean(np.abs(estimates - analytical_var)))
+
+    return analytical_var, estimated_vars_means, avg_errors
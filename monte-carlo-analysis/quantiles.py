@@ -0,0 +1,177 @@
+import numpy as np
+
+
+def linear_index(n, q):
+    """
+    np.percentile 'linear' neighbours for n samples at quantile(s) q in [0, 1]:
+    returns (lower, upper, gamma) with the value = lerp(x[lower], x[upper], gamma).
+    """
+    virtual = (n - 1) * np.atleast_1d(q)
+    lower = np.floor(virtual)
+    gamma = virtual - lower
+    lower = np.minimum(lower.astype(np.intp), n - 1)
+    upper = np.minimum(lower + 1, n - 1)
+    return lower, upper, gamma
+
+
+def lerp(a, b, t):
+    """Same form as numpy's _lerp: forward from a below 0.5, backward from b above."""
+    diff = b - a
+    result = np.add(a, diff * t)
+    np.subtract(b, diff * (1 - t), out=result, where=np.asarray(t) >= 0.5)
+    return result
+
+
+def partition_percentile(samples, percentiles, axis=-1, overwrite_input=False):
+    """
+    Percentile(s) of `samples` along `axis` using partial selection (introselect).
+
+    Reproduces np.percentile's default 'linear' method bit for bit: same virtual
+    index (n - 1) * q, same floor/ceil neighbours and the same two-sided lerp.
+    All requested levels share one np.partition call, and with
+    overwrite_input=True (and axis=-1 on a C-contiguous array) the partition
+    happens in place, so no copy of the samples is made.
+
+    Like np.percentile, the percentile dimension is prepended to the output:
+    a scalar level gives shape samples.shape without `axis`, a 1-D list of k
+    levels gives (k, ...). NaNs are not handled (MC samples never contain them).
+    """
+    weak_q = type(percentiles) in (int, float)
+    q = np.true_divide(percentiles, 100)
+    if np.any(q < 0) or np.any(q > 1):
+        raise ValueError("Percentiles must be in the range [0, 100]")
+
+    arr = np.asarray(samples)
+    arr = np.moveaxis(arr, axis, -1)
+    if not (overwrite_input and arr.flags.c_contiguous):
+        arr = arr.copy()
+    n = arr.shape[-1]
+
+    lower, _, gamma = linear_index(n, q)
+
+    # One selection pass places the lower order statistic of every level.
+    # Selecting only those kth is much cheaper than also selecting lower + 1.
+    kth = np.unique(lower)
+    arr.partition(kth, axis=-1)
+
+    # After the partition everything in (k, next kth] lies between the two
+    # selected values, so the (k + 1)-th order statistic is that segment's min.
+    bounds = np.append(kth[1:], n - 1)
+    a = np.moveaxis(arr[..., lower], -1, 0)
+    b = np.empty_like(a)
+    for i, k in enumerate(lower):
+        if k == n - 1:
+            b[i] = a[i]
+        else:
+            stop = bounds[np.searchsorted(kth, k)] + 1
+            b[i] = arr[..., k + 1:stop].min(axis=-1)
+    if weak_q:
+        t = float(gamma[0])
+    else:
+        t = gamma.reshape(gamma.shape + (1,) * (a.ndim - 1))
+
+    result = lerp(a, b, t)
+
+    if np.ndim(q) == 0:
+        result = result[0]
+        if result.ndim == 0:
+            result = result[()]
+    return result
+
+
+def var_quantiles(samples, confidence_levels, axis=-1, overwrite_input=False):
+    """
+    VaR return thresholds (left-tail quantiles) for one or several confidence levels.
+    95% confidence => 5th percentile of returns, as in calculate_analytical_var.
+    """
+    if np.ndim(confidence_levels) == 0:
+        percentiles = (1 - confidence_levels) * 100
+    else:
+        percentiles = (1 - np.asarray(confidence_levels, dtype=float)) * 100
+    return partition_percentile(samples, percentiles, axis=axis, overwrite_input=overwrite_input)
+
+
+class BracketQuantile:
+    """
+    Exact streaming quantile for one level q known in advance.
+
+    Keeps an exact count of the samples below a bracket [lo, hi] and buffers
+    only the samples inside it. Whenever the buffer outgrows its budget the
+    bracket is tightened around the current empirical q-quantile to
+    +/- z * sqrt(q (1 - q) n) ranks, which is z standard deviations of the
+    empirical quantile's own rank fluctuation. The buffer therefore holds
+    O(z sqrt(n)) samples (a few MB at n = 1e10), and the sorted buffer sits at
+    global ranks [below, below + len(buffer)), so the final value is
+    np.percentile of every sample drawn, bit for bit.
+
+    If the data later drifts so far that the target rank leaves the bracket,
+    value() returns None; that has probability ~exp(-z^2 / 2) per tightening
+    and the caller replays the stream with a larger z (z=inf never tightens).
+    """
+
+    def __init__(self, q, z=8.0, min_buffer=2**16):
+        self.q = float(q)
+        self.z = float(z)
+        self.min_buffer = int(min_buffer)
+        self.n = 0
+        self.below = 0
+        self.lo, self.hi = -np.inf, np.inf
+        self._chunks = []
+        self._buffered = 0
+
+    def update(self, values):
+        values = np.asarray(values).ravel()
+        self.n += values.size
+        if self.lo > -np.inf or self.hi < np.inf:
+            self.below += int(np.count_nonzero(values < self.lo))
+            values = values[(values >= self.lo) & (values <= self.hi)]
+        self._chunks.append(values)
+        self._buffered += values.size
+        if np.isfinite(self.z) and self._buffered > max(self.min_buffer, 4 * self._half_width()):
+            self._tighten()
+
+    def _half_width(self):
+        # z^2 floor: for q * n small the rank count is Poisson-like, not normal
+        return self.z * np.sqrt(self.q * (1 - self.q) * self.n) + self.z**2
+
+    def _buffer(self):
+        buf = np.concatenate(self._chunks) if len(self._chunks) != 1 else self._chunks[0]
+        self._chunks = [buf]
+        return buf
+
+    def _tighten(self):
+        buf = self._buffer()
+        target = self.q * (self.n - 1) - self.below
+        half = self._half_width()
+        i_lo, i_hi = np.floor(target - half), np.ceil(target + half) + 1
+        # A side whose rank window runs off the buffer stays where it is: the
+        # data seen so far cannot place it (e.g. q * n still tiny, or q = 0 / 1)
+        buf.partition([int(i) for i in (i_lo, i_hi) if 0 <= i < buf.size] or [0])
+        lo = buf[int(i_lo)] if i_lo >= 0 else -np.inf
+        hi = buf[int(i_hi)] if i_hi < buf.size else np.inf
+        self.below += int(np.count_nonzero(buf < lo))
+        buf = buf[(buf >= lo) & (buf <= hi)]
+        self.lo, self.hi = max(self.lo, lo), min(self.hi, hi)
+        self._chunks = [buf]
+        self._buffered = buf.size
+
+    def order_statistics(self, ranks):
+        """
+        Values of the given 0-based global ranks among all samples seen, or
+        None if any of them lies outside the bracket.
+        """
+        buf = self._buffer()
+        local = np.asarray(ranks, dtype=np.intp) - self.below
+        if local.size and (local.min() < 0 or local.max() >= buf.size):
+            return None
+        sel = buf.copy()
+        sel.partition(np.unique(local))
+        return sel[local]
+
+    def value(self):
+        """np.percentile(all samples, 100 q), or None if the bracket missed it."""
+        lower, upper, gamma = linear_index(self.n, self.q)
+        values = self.order_statistics([lower[0], upper[0]])
+        if values is None:
+            return None
+        return lerp(values[:1], values[1:], float(gamma[0]))[0]
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Counter-based random streams for the MC sweeps.
+#
+# Every (experiment, sample_size, trial) cell gets its own Generator that is
+# rebuilt directly from those three numbers, so any trial can be regenerated on
+# any machine, in any order, without replaying the ones before it.
+
+MASK64 = (1 << 64) - 1
+
+
+def _philox(experiment, sample_size, trial):
+    # Key = low 128 bits of the experiment id. The cell sits in the two high
+    # counter words, so each cell owns a disjoint 2^128-block counter range and
+    # the stream is addressable with advance() in O(1).
+    key = [experiment & MASK64, (experiment >> 64) & MASK64]
+    counter = [0, 0, int(sample_size) & MASK64, int(trial) & MASK64]
+    return np.random.Philox(key=key, counter=counter)
+
+
+def _pcg64(experiment, sample_size, trial):
+    seed_seq = np.random.SeedSequence(experiment, spawn_key=(int(sample_size), int(trial)))
+    return np.random.PCG64(seed_seq)
+
+
+BACKENDS = {
+    "philox": _philox,
+    "pcg64": _pcg64,
+}
+
+
+def experiment_id(seed=None):
+    """
+    Integer id of an experiment: the seed itself, or fresh 128-bit OS entropy
+    when seed is None. Print it to make an unseeded run replayable.
+    """
+    return int(np.random.SeedSequence(seed).entropy)
+
+
+def trial_generator(experiment, sample_size, trial, backend="philox"):
+    """Generator for the (experiment, sample_size, trial) cell of a sweep."""
+    return np.random.Generator(BACKENDS[backend](experiment, sample_size, trial))
+
+
+def trial_normals(experiment, sample_size, trials, backend="philox", dtype=np.float64):
+    """
+    (len(trials), sample_size) block of standard normals, row j drawn from
+    trial_generator(experiment, sample_size, trials[j]), so every row can be
+    regenerated on its own.
+    """
+    z = np.empty((len(trials), int(sample_size)), dtype=dtype)
+    for row, trial in zip(z, trials):
+        trial_generator(experiment, sample_size, trial, backend).standard_normal(out=row, dtype=dtype)
+    return z
+
+
+def skip_ahead(generator, num_blocks):
+    """
+    Jumps a Philox-backed generator forward by `num_blocks` counter blocks
+    (4 x 64-bit outputs each) in O(1), e.g. to hand disjoint slices of one
+    cell's stream to different workers. Other bit generators count advance()
+    in different units (PCG64: single draws), so they are rejected.
+    """
+    if not isinstance(generator.bit_generator, np.random.Philox):
+        raise TypeError(f"skip_ahead needs a Philox generator, got "
+                        f"{type(generator.bit_generator).__name__}")
+    generator.bit_generator.advance(num_blocks)
+    return generator
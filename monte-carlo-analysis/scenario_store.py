@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+
+from quantiles import var_quantiles
+from rng_streams import experiment_id, trial_generator
+
+# File layout: fixed-size header (magic + JSON, space padded) followed by the raw
+# C-order array, so the data can be mapped with np.memmap(offset=HEADER_SIZE).
+MAGIC = b"MCSCEN01"
+HEADER_SIZE = 4096
+
+# distribution name -> sampler(rng, size, **params)
+SAMPLERS = {
+    "normal": lambda rng, size, loc=0.0, scale=1.0: rng.normal(loc, scale, size),
+    "t": lambda rng, size, df, loc=0.0, scale=1.0: loc + scale * rng.standard_t(df, size),
+    "lognormal": lambda rng, size, mean=0.0, sigma=1.0: rng.lognormal(mean, sigma, size),
+}
+
+
+def _write_header(f, header):
+    payload = MAGIC + json.dumps(header, default=float).encode()
+    if len(payload) > HEADER_SIZE:
+        raise ValueError("Scenario store header too large")
+    f.write(payload.ljust(HEADER_SIZE, b" "))
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if not raw.startswith(MAGIC):
+        raise ValueError(f"{path} is not a scenario store")
+    return json.loads(raw[len(MAGIC):].decode())
+
+
+def create_scenario_store(path, shape, distribution="normal", params=None, seed=None,
+                          dtype=np.float64, max_block_size=2**22, backend="philox"):
+    """
+    Generates scenarios of the given shape (e.g. (num_trials, n)) straight into a
+    memory-mapped file, max_block_size numbers at a time.
+
+    Row t (of length n = shape[-1]; a 1-D store is row 0) is drawn from
+    trial_generator(experiment, n, t, backend), the stream of cell (n, t) in
+    monte_carlo_var_simulation. A ("normal", loc=mu, scale=sigma) store with
+    the sweep's seed therefore holds exactly the sweep's scenarios.
+
+    The header records distribution, params, experiment id, backend, shape and
+    dtype, so a store can be regenerated bit for bit or shared between the
+    classical MC runs and the discretized quantum comparisons. Returns the
+    header dict.
+    """
+    params = {} if params is None else dict(params)
+    sampler = SAMPLERS[distribution]
+    shape = tuple(int(s) for s in np.atleast_1d(shape))
+    experiment = experiment_id(seed)
+    header = {
+        "distribution": distribution,
+        "params": params,
+        "seed": experiment,
+        "backend": backend,
+        "shape": list(shape),
+        "dtype": np.dtype(dtype).str,
+    }
+
+    with open(path, "wb") as f:
+        _write_header(f, header)
+    data = np.memmap(path, dtype=dtype, mode="r+", offset=HEADER_SIZE, shape=shape)
+    rows = data.reshape(-1, shape[-1])
+    for trial, row in enumerate(rows):
+        # Consecutive draws from one stream, so the chunking does not change the row
+        rng = trial_generator(experiment, row.size, trial, backend)
+        for start in range(0, row.size, max_block_size):
+            stop = min(start + max_block_size, row.size)
+            row[start:stop] = sampler(rng, stop - start, **params)
+    data.flush()
+    del data
+    return header
+
+
+def open_scenario_store(path, mode="r"):
+    """Maps a scenario store without copying. Returns (array, header)."""
+    header = read_header(path)
+    data = np.memmap(path, dtype=np.dtype(header["dtype"]), mode=mode,
+                     offset=HEADER_SIZE, shape=tuple(header["shape"]))
+    return data, header
+
+
+def scenario_store_var(path, confidence_levels, max_block_size=2**22):
+    """
+    VaR quantile(s) of every row of a 2-D store (one row per trial), evaluated
+    directly on the mapped array, a block of rows at a time. The 1-D case is
+    treated as a single row. Output layout follows var_quantiles.
+    """
+    data, _ = open_scenario_store(path)
+    rows = data.reshape(-1, data.shape[-1])
+    rows_per_block = max(1, max_block_size // rows.shape[1])
+    blocks = [var_quantiles(rows[start:start + rows_per_block], confidence_levels)
+              for start in range(0, rows.shape[0], rows_per_block)]
+    result = np.concatenate(blocks, axis=-1)
+    return result if data.ndim > 1 else result[..., 0]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from scipy.stats import chi2, ncx2, norm
+
+from delta_gamma import DeltaGammaDistribution, delta_gamma_var
+
+CONFIDENCE_LEVELS = [0.95, 0.99, 0.999, 0.05]
+
+
+@pytest.mark.parametrize("confidence_level", CONFIDENCE_LEVELS)
+@pytest.mark.parametrize("dof", [1, 2, 3])
+def test_pure_gamma_matches_chi2(dof, confidence_level):
+    # P&L = 1/2 dX' (2 I) dX = |dX|^2 ~ chi2(dof), left tail right next to 0
+    var = delta_gamma_var(np.zeros(dof), 2 * np.eye(dof), np.eye(dof), confidence_level)
+    assert var == pytest.approx(chi2(dof).ppf(1 - confidence_level), rel=1e-6, abs=1e-12)
+
+
+@pytest.mark.parametrize("confidence_level", CONFIDENCE_LEVELS)
+def test_short_gamma_matches_chi2(confidence_level):
+    var = delta_gamma_var([0.0], [[-2.0]], [[1.0]], confidence_level)
+    assert var == pytest.approx(-chi2(1).ppf(confidence_level), rel=1e-6)
+
+
+@pytest.mark.parametrize("confidence_level", CONFIDENCE_LEVELS)
+def test_delta_gamma_matches_ncx2(confidence_level):
+    # dX + dX^2 = (dX + 1/2)^2 - 1/4 with (dX + 1/2)^2 ~ ncx2(1, 1/4)
+    var = delta_gamma_var([1.0], [[2.0]], [[1.0]], confidence_level)
+    expected = ncx2(1, 0.25).ppf(1 - confidence_level) - 0.25
+    assert var == pytest.approx(expected, rel=1e-6, abs=1e-12)
+
+
+def test_left_tail_cdf_matches_chi2():
+    x = chi2(1).ppf([1e-4, 1e-3, 0.01, 0.05])
+    cdf = DeltaGammaDistribution([0.0], [[2.0]], [[1.0]]).cdf(x)
+    assert np.allclose(cdf, [1e-4, 1e-3, 0.01, 0.05], rtol=1e-6, atol=0)
+
+
+def test_linear_book_is_gaussian():
+    cov = np.array([[1.0, 0.3], [0.3, 2.0]])
+    delta = np.array([1.0, -0.5])
+    var = delta_gamma_var(delta, np.zeros((2, 2)), cov, 0.99)
+    assert var == pytest.approx(norm(0, np.sqrt(delta @ cov @ delta)).ppf(0.01), rel=1e-9)
+
+
+def test_riskless_book_is_its_constant():
+    dist = DeltaGammaDistribution([1.0, 2.0], np.zeros((2, 2)), np.zeros((2, 2)), mean=[0.5, 0.25])
+    assert dist.ppf(0.01) == 1.0
+    assert np.array_equal(dist.cdf([0.99, 1.0, 1.01]), [0.0, 1.0, 1.0])
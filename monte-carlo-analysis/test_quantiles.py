@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from quantiles import partition_percentile
+
+LEVELS = [5.0, np.float64(5.0), 0, 100, 37.5, [0, 5, 50, 99.9, 100], [95.0, 5.0, 5.0]]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("percentiles", LEVELS, ids=repr)
+@pytest.mark.parametrize("axis", [0, -1])
+@pytest.mark.parametrize("ties", [False, True])
+def test_bit_identical_to_np_percentile(dtype, percentiles, axis, ties):
+    rng = np.random.default_rng(1234)
+    for shape in [(1, 7), (7, 1), (101, 13), (13, 1000)]:
+        samples = rng.standard_normal(shape).astype(dtype)
+        if ties:
+            samples = np.round(samples * 4) / 4
+        expected = np.percentile(samples, percentiles, axis=axis)
+        result = partition_percentile(samples, percentiles, axis=axis)
+        assert np.asarray(result).dtype == np.asarray(expected).dtype
+        assert np.array_equal(result, expected)
+
+
+@pytest.mark.parametrize("percentiles", LEVELS, ids=repr)
+def test_overwrite_input_matches_1d(percentiles):
+    samples = np.random.default_rng(7).standard_normal(10_001)
+    expected = np.percentile(samples, percentiles)
+    result = partition_percentile(samples.copy(), percentiles, overwrite_input=True)
+    assert np.array_equal(result, expected)
+
+
+def test_random_levels_and_sizes():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        n = int(rng.integers(1, 300))
+        samples = rng.standard_normal(n)
+        if rng.random() < 0.5:
+            samples = np.round(samples, 1)
+        q = rng.uniform(0, 100, size=int(rng.integers(1, 4)))
+        assert np.array_equal(partition_percentile(samples, q), np.percentile(samples, q))
+        assert np.array_equal(partition_percentile(samples, float(q[0])),
+                              np.percentile(samples, float(q[0])))
+
+
+def test_rejects_out_of_range_levels():
+    with pytest.raises(ValueError):
+        partition_percentile(np.arange(10.0), 101)